@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+One-off export of yolov8n for fast ARM inference on the Pi.
+
+    python3 export_model.py          # INT8 NCNN export (default)
+    python3 export_model.py onnx     # ONNX export for onnxruntime/XNNPACK
+
+Either way the output lands next to this script and camera_server.py picks
+it up automatically instead of the PyTorch weights. NCNN dispatches to
+NEON SDOT/UDOT 8-bit kernels on the Pi's Cortex-A76; the ONNX path runs
+through onnxruntime's XNNPACK execution provider with hand-tuned NEON
+conv/gemm microkernels and skips the PyTorch stack entirely.
+
+For best INT8 accuracy, point "data" at a small calibration set of
+representative Pi-camera frames (~300 images). Without one, ultralytics
+falls back to its default calibration data, which is usually fine for COCO
+classes like "bottle".
+"""
+import sys
+
+from ultralytics import YOLO
+
+if __name__ == "__main__":
+    fmt = sys.argv[1] if len(sys.argv) > 1 else "ncnn"
+    model = YOLO("yolov8n.pt")
+    if fmt == "onnx":
+        model.export(format="onnx", imgsz=320, simplify=True)
+        print("[EXPORT] Wrote yolov8n.onnx — camera_server.py will use it on next start.")
+    else:
+        model.export(format="ncnn", int8=True, imgsz=320)
+        print("[EXPORT] Wrote yolov8n_ncnn_model/ — camera_server.py will use it on next start.")